@@ -3,12 +3,25 @@
 # mlb scores and standing utility
 
 import argparse
+import atexit
+import collections
+import concurrent.futures
 import datetime
 from datetime import timezone
+import getpass
+import hashlib
+import heapq
 import json
 import os
+import sqlite3
+import stat
 import sys
+import tempfile
+import threading
+import time
 import urllib3
+import uuid
+import zlib
 
 CONF_FILE = 'mlbscores.conf'
 USE_CERTIFI = True
@@ -33,13 +46,23 @@ daytime_rollover = 10
 base_scoreboard_url = "https://statsapi.mlb.com/api/v1/schedule?sportId=1,51&date=%04d-%02d-%02d&leagueId=103,104,420&hydrate=team,linescore(matchup,runners),flags,person,probablePitcher,stats,game(summary)&useLatestGames=false&language=en"
 base_boxscore_url   = "http://statsapi.mlb.com/api/v1/game/%s/boxscore"
 base_standings_uri  = "https://statsapi.mlb.com/api/v1/standings?leagueId=103,104&season=%4s&standingsTypes=regularSeason,springTraining&hydrate=division,conference,league"
+base_season_uri     = "https://statsapi.mlb.com/api/v1/seasons/%4s?sportId=1"
+
+# Connection pool shared by every request made by this process
+poolManager = None
+
+# Responses are shared between mlbscores processes fetching the same URI
+# within fresh_response_seconds of each other
+fresh_response_seconds = 5
+stale_lock_seconds = 30
 
 
 class gameDay:
-    def __init__(self, dayOffset=0):
+    def __init__(self, dayOffset=0, verbose=True):
         self.games = []
         self.bestGames = []
         self.gameDayDate = datetime.datetime.now()
+        self.verbose = verbose
         self.loadGameData(dayOffset)
 
     def loadGameData(self, dayOffset):
@@ -70,7 +93,8 @@ class gameDay:
         try:
             gameData = rawJSON["dates"][0]["games"]
         except:
-            sys.stdout.write("\nNo games scheduled for " + self.gameDayDate.strftime("%A %B %d, %Y") + "\n\n")
+            if self.verbose:
+                sys.stdout.write("\nNo games scheduled for " + self.gameDayDate.strftime("%A %B %d, %Y") + "\n\n")
             # raise Exception("No games scheduled for " + self.gameDayDate.strftime("%A %B %d, %Y") )
             gameData = {}
         return gameData
@@ -139,16 +163,24 @@ class gameDay:
 class game:
     def __init__(self):
         self.gamePk = 0
+        self.gameType = ""
         self.gameTime = datetime.datetime.now()
         self.gameStatus = ""
         self.gameStatusReason = ""
         self.inningState = ""
         self.innings = 0
         self.currentInningOrdinal = ""
+        self.outs = 0
+        self.balls = 0
+        self.strikes = 0
+        self.runnersOn = []
+        self.currentBatter = ""
+        self.currentPitcher = ""
         self.teams = {'home': gameTeam(), 'away': gameTeam()}
 
     def unpackJSON(self, jsonData):
         self.gamePk = jsonData["gamePk"]
+        self.gameType = jsonData.get("gameType", "")
         self.gameStatus = jsonData["status"]["detailedState"]
         try:
             self.gameStatusReason = jsonData['status']['reason']
@@ -177,6 +209,10 @@ class game:
             self.loadHitsAndErrors(linescoreJSON)
         except:
             pass
+        try:
+            self.loadLiveState(jsonData['linescore'])
+        except:
+            pass
 
     def extractGameTime(self, jsonData):
         try:
@@ -214,17 +250,39 @@ class game:
             except:
                 self.teams[side].errors = 0
 
-    def loadBoxScore(self):
-        jsonData = self.loadBoxJSON()
+    def loadLiveState(self, linescore):
+        for key in ['outs', 'balls', 'strikes']:
+            try:
+                setattr(self, key, int(linescore[key]))
+            except:
+                setattr(self, key, 0)
+        offense = linescore.get('offense', {})
+        self.runnersOn = [base for base in ['first', 'second', 'third'] if base in offense]
+        self.currentBatter = self.getPersonName(offense, 'batter')
+        self.currentPitcher = self.getPersonName(linescore.get('defense', {}), 'pitcher')
+
+    def getPersonName(self, jsonData, key):
+        try:
+            person = jsonData[key]
+        except:
+            return ""
+        if 'lastName' in person:
+            return person['lastName']
+        # Linescore people usually only carry fullName, drop the first name
+        # to match the last names shown everywhere else
+        return person.get('fullName', "").split(' ', 1)[-1]
+
+    def loadBoxScore(self, verbose=True):
+        jsonData = self.loadBoxJSON(verbose)
         for side in ['home', 'away']:
             self.teams[side].loadBoxScore(jsonData['teams'][side])
         return
 
-    def loadBoxJSON(self):
+    def loadBoxJSON(self, verbose=True):
         boxscore_url = self.formBoxScoreURL()
         loader = JSONloader(boxscore_url)
         jsondata = loader.loadJSON()
-        if len(jsondata.keys()) == 0:
+        if len(jsondata.keys()) == 0 and verbose:
             sys.stdout.write("   No box score data available                \n")
         return jsondata
 
@@ -287,6 +345,13 @@ class game:
     def isPostponed(self):
         return self.gameStatus == 'Postponed'
 
+    def isRegularSeason(self):
+        return self.gameType == 'R'
+
+    def isFinal(self):
+        finalKeys = ["Final", "Game Over", "Completed Early"]
+        return self.gameStatus in finalKeys
+
     def printScore(self):
         if self.hasLineScore():
             homeTeamRuns = self.teams['home'].getTotalRuns()
@@ -300,13 +365,25 @@ class game:
 
     def printGameDetails(self):
         self.printLineScore()
+        if self.isInProgress():
+            self.printLiveState()
+        self.printLineScoreFooter()
 
     def printLineScore(self):
         inningsToPrint = max(9, self.innings)
         self.printLineScoreHeader(inningsToPrint)
         self.teams['away'].printLineScore(inningsToPrint)
         self.teams['home'].printLineScore(inningsToPrint)
-        self.printLineScoreFooter()
+
+    def printLiveState(self):
+        runnerNames = {'first': '1st', 'second': '2nd', 'third': '3rd'}
+        if len(self.runnersOn) > 0:
+            runners = "on " + " ".join(runnerNames[base] for base in self.runnersOn)
+        else:
+            runners = "bases empty"
+        sys.stdout.write("    %d out, %d-%d, %-15s %s vs %s\n" % \
+                         (self.outs, self.balls, self.strikes, runners, \
+                          self.currentBatter, self.currentPitcher))
 
     def printLineScoreHeader(self, inningsToPrint):
         sys.stdout.write("    ")
@@ -327,7 +404,10 @@ class game:
 
 class gameTeam:
     def __init__(self):
+        self.teamId = 0
         self.nameAbbreviation = ""
+        self.leagueWins = 0
+        self.leagueLosses = 0
         self.name = ""
         self.probablePitcher = pitcher()
         self.runsByInning = []
@@ -359,6 +439,7 @@ class gameTeam:
             'pitchers': "   %-20s      %3d %2d %2d %2d %2d %2d\n\n"}
 
     def unpackJSON(self, jsonData):
+        self.teamId = jsonData['team']["id"]
         self.nameAbbreviation = jsonData['team']["abbreviation"]
         self.name = jsonData['team']["name"]
         try:
@@ -372,6 +453,13 @@ class gameTeam:
         except:
             self.probablePitcher.stats['era'] = "-"
 
+        try:
+            self.leagueWins = int(jsonData['leagueRecord']['wins'])
+            self.leagueLosses = int(jsonData['leagueRecord']['losses'])
+        except:
+            self.leagueWins = 0
+            self.leagueLosses = 0
+
     def loadBoxScore(self, jsonData):
         self.loadBatterBoxes(jsonData)
         self.loadPitcherBoxes(jsonData)
@@ -521,7 +609,8 @@ class batter(player):
         self.stats = {"atBats": 0, "hits": 0, "baseOnBalls": 0, \
                       "runs": 0, "homeRuns": 0, "strikeOuts": 0, \
                       "hitByPitch": 0, "sacFlies": 0, "sacBunts": 0, \
-                      "plateAppearances": 0,\
+                      "doubles": 0, "triples": 0, \
+                      "plateAppearances": 0, "gameOPS": 0.0,\
                       "avg": 0.0, "obp": 0.0, "slg": 0.0, "ops": 0.0}
         self.position = ""
 
@@ -534,8 +623,9 @@ class batter(player):
 
     def loadGameStats(self, jsonData):
         gameStatKeys = ["atBats", "hits", "baseOnBalls", "runs", "homeRuns",\
-                        "strikeOuts", "hitByPitch", "sacFlies", "sacBunts"]
-        gameStatType = [int, int, int, int, int, int, int, int, int]
+                        "strikeOuts", "hitByPitch", "sacFlies", "sacBunts",\
+                        "doubles", "triples"]
+        gameStatType = [int, int, int, int, int, int, int, int, int, int, int]
         for key, keyType in zip(gameStatKeys, gameStatType):
             try:
                 self.stats[key] = keyType(jsonData[key])
@@ -544,7 +634,7 @@ class batter(player):
 
     def loadSeasonStats(self, jsonData):
         seasonStatKeys = ['avg', 'obp', 'slg']
-        seasonStatType = [float, float]
+        seasonStatType = [float, float, float]
         for key, keyType in zip(seasonStatKeys, seasonStatType):
             try:
                 self.stats[key] = keyType(jsonData[key])
@@ -554,6 +644,7 @@ class batter(player):
     def loadDerivedStats(self):
         self.setBoxName()
         self.setOPS()
+        self.setGameOPS()
         self.setPlateAppearances()
 
     def setBoxName(self):
@@ -562,6 +653,15 @@ class batter(player):
     def setOPS(self):
         self.stats['ops'] = self.stats['obp'] + self.stats['slg']
 
+    def setGameOPS(self):
+        onBaseEvents = self.stats['hits'] + self.stats['baseOnBalls'] + self.stats['hitByPitch']
+        onBaseChances = onBaseEvents - self.stats['hits'] + self.stats['atBats'] + self.stats['sacFlies']
+        totalBases = self.stats['hits'] + self.stats['doubles'] + \
+                     2*self.stats['triples'] + 3*self.stats['homeRuns']
+        gameOBP = onBaseEvents / onBaseChances if onBaseChances > 0 else 0.0
+        gameSLG = totalBases / self.stats['atBats'] if self.stats['atBats'] > 0 else 0.0
+        self.stats['gameOPS'] = gameOBP + gameSLG
+
     def setPlateAppearances(self):
         plateAppearanceKeys = ['atBats', 'baseOnBalls', 'hitByPitch',\
                                'sacFlies', 'sacBunts']
@@ -578,6 +678,10 @@ class standings:
          [u'American League East', u'American League Central',u'American League West',\
           u'National League East',  u'National League Central', u'National League West']
         self.divisions = {}
+        self.leagues = {}
+        self.teamsById = {}
+        self.appliedGamePks = set()
+        self.wildCardSpots = 3
 
         # Set up some arrays in a dictionary for team data
         for k in self.divisionOrder:
@@ -601,21 +705,21 @@ class standings:
         return standingsData
 
     def getRecordsFromURI(self, uri):
-        standingsjson = ''
-        if USE_CERTIFI:
-            standingsjson = urllib3.PoolManager(cert_reqs='CERT_REQUIRED', ca_certs=certifi.where()).request('GET', uri)
-        else:
-            standingsjson = urllib3.PoolManager().request('GET', uri)
-
-        standingsRecords = json.loads(standingsjson.data)["records"]
+        loader = JSONloader(uri)
+        standingsRecords = loader.loadJSON()["records"]
         return standingsRecords
 
     def loadDivisionData(self, divisionData):
         divisionKey = divisionData['division']['name']
         if divisionData['standingsType'] == "regularSeason":
+            leagueKey = divisionData['league']['id']
+            self.leagues.setdefault(leagueKey, []).append(divisionKey)
             for teamJSONData in divisionData["teamRecords"]:
                 aTeam = self.loadTeamData(teamJSONData)
+                aTeam.divisionKey = divisionKey
+                aTeam.leagueKey = leagueKey
                 self.divisions[divisionKey].append(aTeam)
+                self.teamsById[aTeam.teamId] = aTeam
 
     def loadTeamData(self, teamData):
         thisTeam = seasonTeam()
@@ -624,6 +728,11 @@ class standings:
         except:
             thisTeam.name = 'fail'
 
+        try:
+            thisTeam.teamId = teamData['team']['id']
+        except:
+            thisTeam.teamId = 0
+
         try:
             thisTeam.wins = int(teamData['wins'])
         except:
@@ -664,8 +773,83 @@ class standings:
         except:
             thisTeam.streakCode = '-'
 
+        thisTeam.seedLastTen()
         return thisTeam
 
+    def reconcileFinishedGames(self, aGameDay):
+        # The standings response can lag behind games already final on the
+        # scoreboard. A team has the game counted once its seeded W+L reaches
+        # the record the scoreboard lists with that game.
+        for aGame in aGameDay.bestGames + aGameDay.games:
+            if aGame.isFinal() and aGame.isRegularSeason():
+                self.appliedGamePks.add(aGame.gamePk)
+                uncountedSides = [side for side in ['home', 'away'] \
+                                  if not self.isGameCounted(aGame.teams[side])]
+                self.applyResults(aGame, uncountedSides)
+
+    def isGameCounted(self, aGameTeam):
+        aTeam = self.teamsById.get(aGameTeam.teamId)
+        gamesWithResult = aGameTeam.leagueWins + aGameTeam.leagueLosses
+        if aTeam is None or gamesWithResult == 0:
+            return True
+        return aTeam.wins + aTeam.losses >= gamesWithResult
+
+    def applyGameDay(self, aGameDay):
+        for aGame in aGameDay.bestGames + aGameDay.games:
+            self.applyGame(aGame)
+
+    def applyGame(self, aGame):
+        if aGame.gamePk in self.appliedGamePks or not aGame.isFinal() \
+           or not aGame.isRegularSeason():
+            return
+        self.appliedGamePks.add(aGame.gamePk)
+        self.applyResults(aGame, ['home', 'away'])
+
+    def applyResults(self, aGame, sides):
+        runs = {side: aGame.teams[side].getTotalRuns() for side in ['home', 'away']}
+        if runs['home'] == runs['away']:
+            return
+
+        updatedTeams = []
+        for side in sides:
+            aTeam = self.teamsById.get(aGame.teams[side].teamId)
+            if aTeam is not None:
+                otherSide = 'away' if side == 'home' else 'home'
+                aTeam.applyResult(runs[side] > runs[otherSide])
+                updatedTeams.append(aTeam)
+        for divisionKey in {aTeam.divisionKey for aTeam in updatedTeams}:
+            self.updateDivisionGamesBack(divisionKey)
+        for leagueKey in {aTeam.leagueKey for aTeam in updatedTeams}:
+            self.updateWildCardGamesBack(leagueKey)
+
+    def updateDivisionGamesBack(self, divisionKey):
+        division = self.divisions[divisionKey]
+        division.sort(key=lambda aTeam: aTeam.winningPercentage, reverse=True)
+        leader = division[0]
+        for aTeam in division:
+            aTeam.gb = self.formGamesBack(aTeam.getGamesBehind(leader))
+
+    def updateWildCardGamesBack(self, leagueKey):
+        contenders = []
+        for divisionKey in self.leagues[leagueKey]:
+            division = self.divisions[divisionKey]
+            if len(division) > 0:
+                division[0].wcgb = '-'
+                contenders += division[1:]
+        if len(contenders) == 0:
+            return
+        contenders.sort(key=lambda aTeam: aTeam.winningPercentage, reverse=True)
+        cutoffTeam = contenders[min(self.wildCardSpots, len(contenders)) - 1]
+        for aTeam in contenders:
+            aTeam.wcgb = self.formGamesBack(aTeam.getGamesBehind(cutoffTeam))
+
+    def formGamesBack(self, gamesBehind):
+        if gamesBehind == 0:
+            return '-'
+        elif gamesBehind < 0:
+            return "+%.1f" % -gamesBehind
+        return "%.1f" % gamesBehind
+
     def printStandings(self):
         self.printStandingsHeader()
         for divisionKey in self.divisionOrder:
@@ -694,6 +878,9 @@ class standings:
 class seasonTeam:
     def __init__(self):
         self.name = ""
+        self.teamId = 0
+        self.divisionKey = ""
+        self.leagueKey = 0
         self.pct = 0.0
         self.streakCode = "-"
         self.wins = 0
@@ -703,6 +890,7 @@ class seasonTeam:
         self.gb = '-'
         self.wcgb = '-'
         self.winningPercentage = 0.0
+        self.lastTen = collections.deque(maxlen=10)
         self.standingFormatString = "%-24s %4d %4d   %5.3f %4s %4s %2d -%2d %4s\n"
 
     def printStanding(self):
@@ -715,18 +903,183 @@ class seasonTeam:
                          self.last10wins, self.last10losses, self.streakCode)
         return standingTuple
 
+    def seedLastTen(self):
+        streakWon = self.streakCode[:1] == 'W'
+        try:
+            streakLength = int(self.streakCode[1:])
+        except:
+            streakLength = 0
+        wins = self.last10wins
+        losses = self.last10losses
+        if streakWon:
+            streakLength = min(streakLength, wins)
+            wins -= streakLength
+            # Order before the streak is unknown, but the game before it broke it
+            older = [True]*wins + [False]*losses
+        else:
+            streakLength = min(streakLength, losses)
+            losses -= streakLength
+            older = [False]*losses + [True]*wins
+        self.lastTen = collections.deque(older + [streakWon]*streakLength, maxlen=10)
+
+    def applyResult(self, won):
+        if won:
+            self.wins += 1
+        else:
+            self.losses += 1
+        self.winningPercentage = self.wins / (self.wins + self.losses)
+        self.lastTen.append(won)
+        self.last10wins = sum(self.lastTen)
+        self.last10losses = len(self.lastTen) - self.last10wins
+        self.updateStreak(won)
+
+    def updateStreak(self, won):
+        resultCode = 'W' if won else 'L'
+        if self.streakCode[:1] == resultCode:
+            try:
+                self.streakCode = resultCode + str(int(self.streakCode[1:]) + 1)
+                return
+            except:
+                pass
+        self.streakCode = resultCode + '1'
+
+    def getGamesBehind(self, otherTeam):
+        return ((otherTeam.wins - self.wins) + (self.losses - otherTeam.losses)) / 2
+
+
+class dailyLeaders:
+    def __init__(self, aGameDay, count=5, workers=8):
+        self.gameDay = aGameDay
+        self.count = count
+        self.workers = workers
+        self.leaders = {'batters': [], 'pitchers': []}
+        self.leaderKeys = {
+            'batters': ['homeRuns', 'hits', 'gameOPS'], \
+            'pitchers': ['strikeOuts', 'inningsPitched', 'pitchesThrown']}
+        self.leaderHeaderString = { \
+            'batters':  "%-27s Team  HR   H    OPS\n", \
+            'pitchers': "%-27s Team  SO    IP  PC\n"}
+        self.leaderFormatString = { \
+            'batters':  "   %-23s  %-3s %3d %3d  %5.3f\n", \
+            'pitchers': "   %-23s  %-3s %3d %5.1f %3d\n"}
+        self.leaderTitles = {'batters': "Top batters", 'pitchers': "Top pitchers"}
+
+    def loadLeaders(self):
+        startedGames = [aGame for aGame in self.gameDay.bestGames + self.gameDay.games \
+                        if not aGame.isWaitingToStart() and not aGame.isPostponed()]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            loadedGames = [aGame for aGame in executor.map(self.tryToLoadBoxScore, startedGames) \
+                           if aGame is not None]
+        for playerSet in ['batters', 'pitchers']:
+            self.leaders[playerSet] = self.selectLeaders(loadedGames, playerSet)
+
+    def tryToLoadBoxScore(self, aGame):
+        try:
+            # Games without a box score are left out of the table silently
+            aGame.loadBoxScore(verbose=False)
+        except (Exception, URIException):
+            return None
+        return aGame
+
+    def selectLeaders(self, loadedGames, playerSet):
+        keys = self.leaderKeys[playerSet]
+        candidates = ((aPlayer, aTeam.nameAbbreviation) \
+                      for aGame in loadedGames \
+                      for aTeam in aGame.teams.values() \
+                      for aPlayer in aTeam.players[playerSet])
+        return heapq.nlargest(self.count, candidates, \
+                              key=lambda candidate: tuple(candidate[0].stats[k] for k in keys))
+
+    def printLeaders(self):
+        for playerSet in ['batters', 'pitchers']:
+            self.printLeaderTable(playerSet)
+
+    def printLeaderTable(self, playerSet):
+        sys.stdout.write(self.leaderHeaderString[playerSet] % self.leaderTitles[playerSet])
+        for aPlayer, teamAbbreviation in self.leaders[playerSet]:
+            formatVals = (aPlayer.fullName[:23], teamAbbreviation) + \
+                         tuple(aPlayer.stats[k] for k in self.leaderKeys[playerSet])
+            sys.stdout.write(self.leaderFormatString[playerSet] % formatVals)
+        sys.stdout.write("\n")
+
+
+class gameEventFeed:
+    def __init__(self, teams=[]):
+        self.teams = teams
+        self.fingerprints = {}
+        self.lastGames = {}
+
+    def poll(self, aGameDay):
+        for aGame in aGameDay.bestGames + aGameDay.games:
+            if len(self.teams) == 0 or aGameDay.hasTeam(aGame, self.teams):
+                self.checkGame(aGame)
+        sys.stdout.flush()
+
+    def checkGame(self, aGame):
+        fingerprint = self.getFingerprint(aGame)
+        if self.fingerprints.get(aGame.gamePk) == fingerprint:
+            return
+        self.fingerprints[aGame.gamePk] = fingerprint
+        eventTypes = self.getEventTypes(self.lastGames.get(aGame.gamePk), aGame)
+        self.lastGames[aGame.gamePk] = aGame
+        for eventType in eventTypes:
+            self.printEvent(eventType, aGame)
+
+    def getFingerprint(self, aGame):
+        return hash((aGame.gameStatus, aGame.gameStatusReason, \
+                     aGame.inningState, aGame.currentInningOrdinal) + \
+                    tuple(self.getTeamState(aGame.teams[side]) for side in ['away', 'home']))
+
+    def getTeamState(self, aTeam):
+        return (tuple(aTeam.runsByInning), aTeam.hits, aTeam.errors)
+
+    def getEventTypes(self, previousGame, aGame):
+        # A game seen for the first time reports its current state, so a feed
+        # started late still hears about earlier postponements and finals
+        eventTypes = []
+        if previousGame is not None and \
+           self.getTotalRuns(aGame) > self.getTotalRuns(previousGame):
+            eventTypes.append("run_scored")
+        if aGame.isFinal() and (previousGame is None or not previousGame.isFinal()):
+            eventTypes.append("game_final")
+        elif aGame.isPostponed() and (previousGame is None or not previousGame.isPostponed()):
+            eventTypes.append("postponed")
+        if len(eventTypes) == 0:
+            eventTypes.append("game_state")
+        return eventTypes
+
+    def getTotalRuns(self, aGame):
+        return aGame.teams['away'].getTotalRuns() + aGame.teams['home'].getTotalRuns()
+
+    def printEvent(self, eventType, aGame):
+        event = {"event": eventType,
+                 "time": datetime.datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                 "gamePk": aGame.gamePk,
+                 "status": aGame.gameStatus,
+                 "reason": aGame.gameStatusReason,
+                 "inningState": aGame.inningState,
+                 "inning": aGame.currentInningOrdinal}
+        for side in ['away', 'home']:
+            aTeam = aGame.teams[side]
+            event[side] = {"team": aTeam.nameAbbreviation, "runs": aTeam.getTotalRuns(), \
+                           "hits": aTeam.getTotalHits(), "errors": aTeam.getTotalErrors()}
+        sys.stdout.write(json.dumps(event, separators=(',', ':')) + "\n")
+
 
 class JSONloader():
     def __init__(self, uri):
         self.uri = uri
 
+    def loadResponse(self):
+        return getPoolManager().request('GET', self.uri)
+
+    def loadData(self):
+        return fetchCoordinator.load(self.uri, self.loadResponse)
+
     def loadJSON(self):
-        if USE_CERTIFI:
-            jsondata = urllib3.PoolManager(cert_reqs='CERT_REQUIRED', ca_certs=certifi.where()).request('GET', self.uri)
-        else:
-            jsondata = urllib3.PoolManager().request('GET', self.uri)
+        jsondata = self.loadData()
         try:
-            readdata = json.loads(jsondata.data)
+            readdata = json.loads(jsondata)
         except:
             raise URIException("Could not load ", self.uri)
             readdata = {}
@@ -738,6 +1091,394 @@ class URIException(BaseException):
         self.value = value
 
 
+# The process holding a URI's lock file fetches it, the others reuse its response
+class singleFlight:
+    def __init__(self, cacheDir):
+        self.cacheDir = cacheDir
+        self.cacheDirIsSafe = None
+        self.pollInterval = 0.05
+        self.pruneSeconds = 3600
+        self.stats = {'fetched': 0, 'coalesced': 0, 'staleLocks': 0}
+
+    def load(self, uri, fetchResponse):
+        if self.cacheDirIsSafe is None:
+            self.cacheDirIsSafe = self.prepareCacheDir()
+        if not self.cacheDirIsSafe:
+            return self.fetch(fetchResponse, None)
+
+        key = hashlib.sha1(uri.encode()).hexdigest()
+        responsePath = os.path.join(self.cacheDir, key + ".json")
+        lockPath = os.path.join(self.cacheDir, key + ".lock")
+        while True:
+            data = self.readFreshResponse(responsePath)
+            if data is not None:
+                self.stats['coalesced'] += 1
+                return data
+            token = self.tryToLock(lockPath)
+            if token is None:
+                return self.fetch(fetchResponse, None)
+            elif token:
+                try:
+                    # The previous holder may have saved it just before unlocking
+                    data = self.readFreshResponse(responsePath)
+                    if data is not None:
+                        self.stats['coalesced'] += 1
+                        return data
+                    return self.fetch(fetchResponse, responsePath)
+                finally:
+                    self.removeLock(lockPath, token)
+            else:
+                staleToken = self.getStaleToken(lockPath)
+                if staleToken is not None and self.removeLock(lockPath, staleToken):
+                    self.stats['staleLocks'] += 1
+                else:
+                    time.sleep(self.pollInterval)
+
+    def prepareCacheDir(self):
+        # The directory sits at a predictable path in the shared temp
+        # directory, so only trust it when no other user can write to it
+        try:
+            os.makedirs(self.cacheDir, mode=0o700, exist_ok=True)
+            dirStat = os.lstat(self.cacheDir)
+        except OSError:
+            return False
+        if not stat.S_ISDIR(dirStat.st_mode):
+            return False
+        if hasattr(os, 'getuid') and dirStat.st_uid != os.getuid():
+            return False
+        return dirStat.st_mode & (stat.S_IWGRP | stat.S_IWOTH) == 0
+
+    def fetch(self, fetchResponse, responsePath):
+        response = fetchResponse()
+        self.stats['fetched'] += 1
+        if responsePath is not None and response.status == 200:
+            self.saveResponse(responsePath, response.data)
+        return response.data
+
+    def readFreshResponse(self, responsePath):
+        try:
+            if time.time() - os.path.getmtime(responsePath) > fresh_response_seconds:
+                return None
+            with open(responsePath, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def saveResponse(self, responsePath, data):
+        try:
+            fd, tmpPath = tempfile.mkstemp(dir=self.cacheDir)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmpPath, responsePath)
+        except OSError:
+            pass
+        self.pruneOldResponses()
+
+    def pruneOldResponses(self):
+        cutoff = time.time() - self.pruneSeconds
+        try:
+            for entry in os.scandir(self.cacheDir):
+                if not entry.name.endswith(".lock") and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+        except OSError:
+            pass
+
+    def tryToLock(self, lockPath):
+        # Our token when locked by us, "" when held by someone else and
+        # None when locking is not possible here at all
+        token = "%d %s" % (os.getpid(), uuid.uuid4().hex)
+        try:
+            fd, tokenPath = tempfile.mkstemp(dir=self.cacheDir)
+        except OSError:
+            return None
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(token)
+            # Linking a finished file means a lock is never seen without its token
+            os.link(tokenPath, lockPath)
+        except FileExistsError:
+            return ""
+        except OSError:
+            return None
+        finally:
+            try:
+                os.remove(tokenPath)
+            except OSError:
+                pass
+        return token
+
+    def removeLock(self, lockPath, expectedToken):
+        # Move the lock aside first so that checking its token and removing
+        # it cannot interleave with another process doing the same
+        asidePath = "%s.%s" % (lockPath, uuid.uuid4().hex)
+        try:
+            os.rename(lockPath, asidePath)
+        except OSError:
+            return False
+        try:
+            if self.readLockToken(asidePath) == expectedToken:
+                return True
+            # Not the lock we meant to remove, put it back for its holder
+            try:
+                os.link(asidePath, lockPath)
+            except OSError:
+                pass
+            return False
+        finally:
+            try:
+                os.remove(asidePath)
+            except OSError:
+                pass
+
+    def readLockToken(self, lockPath):
+        try:
+            with open(lockPath, 'r') as f:
+                return f.read()
+        except OSError:
+            return ""
+
+    def getStaleToken(self, lockPath):
+        # The token of a stale lock, possibly empty or garbled, or None when
+        # the lock is gone or still valid
+        try:
+            lockAge = time.time() - os.path.getmtime(lockPath)
+        except OSError:
+            return None
+        token = self.readLockToken(lockPath)
+        if lockAge > stale_lock_seconds:
+            return token
+        try:
+            pid = int(token.split()[0])
+        except (IndexError, ValueError):
+            return None
+        if not self.isProcessAlive(pid):
+            return token
+        return None
+
+    def isProcessAlive(self, pid):
+        if os.name != 'posix':
+            return True
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except OSError:
+            pass
+        return True
+
+    def printStats(self):
+        sys.stderr.write("mlbscores: %d fetched, %d coalesced, %d stale locks recovered\n" % \
+                         (self.stats['fetched'], self.stats['coalesced'], self.stats['staleLocks']))
+
+
+def getCacheDir():
+    try:
+        user = getpass.getuser()
+    except Exception:
+        user = "user"
+    return os.path.join(tempfile.gettempdir(), "mlbscores-" + user)
+
+
+fetchCoordinator = singleFlight(getCacheDir())
+
+
+def getPoolManager():
+    global poolManager
+    if poolManager is None:
+        if USE_CERTIFI:
+            poolManager = urllib3.PoolManager(maxsize=16, cert_reqs='CERT_REQUIRED', ca_certs=certifi.where())
+        else:
+            poolManager = urllib3.PoolManager(maxsize=16)
+    return poolManager
+
+
+# zlib compressed responses keyed by URI in a sqlite file
+class localStore:
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS pages (uri TEXT PRIMARY KEY, data BLOB)")
+        self.connection.commit()
+
+    def has(self, uri):
+        row = self.connection.execute("SELECT 1 FROM pages WHERE uri = ?", (uri,)).fetchone()
+        return row is not None
+
+    def put(self, uri, data):
+        self.connection.execute("INSERT OR REPLACE INTO pages (uri, data) VALUES (?, ?)", \
+                                (uri, zlib.compress(data, 9)))
+
+    def get(self, uri):
+        row = self.connection.execute("SELECT data FROM pages WHERE uri = ?", (uri,)).fetchone()
+        if row is None:
+            return None
+        return zlib.decompress(row[0])
+
+    def checkpoint(self):
+        self.connection.commit()
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+
+class rateLimiter:
+    def __init__(self, requestsPerSecond):
+        self.interval = 1.0 / max(requestsPerSecond, 0.001)
+        self.nextSlot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.nextSlot)
+            self.nextSlot = slot + self.interval
+        time.sleep(slot - now)
+
+
+class progressMeter:
+    def __init__(self, label, total):
+        self.label = label
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.startTime = time.monotonic()
+
+    def update(self, succeeded):
+        self.done += 1
+        if not succeeded:
+            self.failed += 1
+        self.printProgress()
+
+    def getRate(self):
+        elapsed = time.monotonic() - self.startTime
+        if elapsed <= 0:
+            return 0.0
+        return self.done / elapsed
+
+    def getETA(self):
+        rate = self.getRate()
+        if rate <= 0:
+            return "--:--:--"
+        remaining = int((self.total - self.done) / rate)
+        return "%02d:%02d:%02d" % (remaining // 3600, (remaining % 3600) // 60, remaining % 60)
+
+    def printProgress(self):
+        sys.stdout.write("\r  %-10s %6d/%-6d %3d to retry  %6.1f req/s  ETA %s" % \
+                         (self.label, self.done, self.total, self.failed, self.getRate(), self.getETA()))
+        sys.stdout.flush()
+
+    def printSummary(self):
+        self.printProgress()
+        sys.stdout.write("\n")
+
+
+# Stored URIs are skipped, so rerunning resumes an interrupted backfill
+class seasonBackfill:
+    def __init__(self, season, storePath, workers=8, requestsPerSecond=10):
+        self.season = season
+        self.store = localStore(storePath)
+        self.workers = workers
+        self.limiter = rateLimiter(requestsPerSecond)
+        self.checkpointInterval = 50
+        self.finalStates = ["Final", "Game Over", "Completed Early"]
+
+    def run(self):
+        sys.stdout.write("\nBackfilling %s season into %s\n\n" % (self.season, self.store.path))
+        try:
+            scheduleURIs = self.planScheduleURIs()
+            self.fetchAll("schedule", scheduleURIs, self.isScheduleComplete)
+            self.fetchAll("boxscores", self.planBoxScoreURIs(scheduleURIs))
+        except KeyboardInterrupt:
+            sys.stdout.write("\n\nInterrupted, rerun the same command to resume\n")
+        finally:
+            self.store.close()
+
+    def planScheduleURIs(self):
+        firstDay, lastDay = self.getSeasonDates()
+        lastDay = min(lastDay, datetime.date.today() - datetime.timedelta(1))
+        uris = []
+        day = firstDay
+        while day <= lastDay:
+            uris.append(base_scoreboard_url % (day.year, day.month, day.day))
+            day += datetime.timedelta(1)
+        return uris
+
+    def getSeasonDates(self):
+        try:
+            seasonJSON = JSONloader(base_season_uri % self.season).loadJSON()['seasons'][0]
+            firstDay = datetime.date.fromisoformat(seasonJSON['seasonStartDate'])
+            lastDay = datetime.date.fromisoformat(seasonJSON['seasonEndDate'])
+        except:
+            firstDay = datetime.date(int(self.season), 2, 1)
+            lastDay = datetime.date(int(self.season), 11, 30)
+        return firstDay, lastDay
+
+    def planBoxScoreURIs(self, scheduleURIs):
+        gamePks = []
+        for uri in scheduleURIs:
+            gamePks += self.getFinishedGamePks(uri)
+        uris = [base_boxscore_url % pk for pk in dict.fromkeys(gamePks)]
+        return uris
+
+    def getFinishedGamePks(self, scheduleURI):
+        data = self.store.get(scheduleURI)
+        if data is None:
+            return []
+        gamePks = []
+        try:
+            for aDate in json.loads(data)["dates"]:
+                for aGame in aDate["games"]:
+                    if aGame["status"]["detailedState"] in self.finalStates:
+                        gamePks.append(aGame["gamePk"])
+        except:
+            pass
+        return gamePks
+
+    def isScheduleComplete(self, data):
+        try:
+            for aDate in json.loads(data)["dates"]:
+                for aGame in aDate["games"]:
+                    if aGame["status"]["abstractGameState"] != "Final":
+                        return False
+        except:
+            return False
+        return True
+
+    def fetchAll(self, label, uris, isComplete=None):
+        pending = [uri for uri in uris if not self.store.has(uri)]
+        meter = progressMeter(label, len(pending))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self.fetchOne, uri) for uri in pending]
+            try:
+                for future in concurrent.futures.as_completed(futures):
+                    uri, data = future.result()
+                    if data is not None and isComplete is not None and not isComplete(data):
+                        data = None
+                    if data is not None:
+                        self.store.put(uri, data)
+                    meter.update(data is not None)
+                    if meter.done % self.checkpointInterval == 0:
+                        self.store.checkpoint()
+            except KeyboardInterrupt:
+                for future in futures:
+                    future.cancel()
+                raise
+            finally:
+                self.store.checkpoint()
+        meter.printSummary()
+
+    def fetchOne(self, uri):
+        self.limiter.wait()
+        try:
+            response = JSONloader(uri).loadResponse()
+        except Exception:
+            return uri, None
+        if response.status != 200:
+            return uri, None
+        return uri, response.data
+
+
 def getExplicitTeams(passedTeams):
     explicitTeams = []
     if len(passedTeams) > 0:
@@ -758,18 +1499,95 @@ def configureArgParser():
     argtgroup.add_argument("-y",  action="store_const", dest="dayoffset", const=-1, help="Show for yesterday")
     argtgroup.add_argument("-t",  action="store_const", dest="dayoffset", const=1, help="Show for tomorrow")
     argtgroup.add_argument("-tt", action="store_const", dest="dayoffset", const=2, help="Show for two days from now")
+    argparser.add_argument("--watch",   type=int, dest="watch", nargs="?", const=60, metavar="SECONDS", help="Refresh output every SECONDS (default: 60)")
+    argparser.add_argument("--events",  action="store_true", dest="events", help="Print NDJSON score change events, polling every --watch SECONDS (default: 30)")
+    argparser.add_argument("--leaders", type=int, dest="leaders", nargs="?", const=5, metavar="N", help="Show the top N batters and pitchers of the day (default: 5)")
+    argparser.add_argument("--fetch-stats", action="store_true", dest="fetchstats", help="Report fetched and coalesced requests on exit")
+    argparser.add_argument("--backfill", action="store_true", dest="backfill", help="Save every schedule and box score of a season to a local store")
+    argparser.add_argument("--season",  type=int, dest="season", default=datetime.date.today().year, help="Season for --backfill (default: current year)")
+    argparser.add_argument("--store",   dest="store", help="Store file for --backfill (default: mlbscores-SEASON.db)")
+    argparser.add_argument("--workers", type=int, dest="workers", default=8, help="Parallel requests for --backfill and --leaders (default: 8)")
+    argparser.add_argument("--rate",    type=float, dest="rate", default=10, help="Maximum requests per second for --backfill (default: 10)")
 
     return argparser
 
 
+def watchGameDay(args, explicitTeams):
+    # Scoreboard first, so the standings response is at least as new
+    thisGameDay = gameDay(args.dayoffset)
+    theseStandings = None
+    if args.standings:
+        theseStandings = standings()
+        theseStandings.reconcileFinishedGames(thisGameDay)
+
+    try:
+        while True:
+            sys.stdout.write("\033[2J\033[H")
+            thisGameDay.printGameDay(args.boxscore, explicitTeams)
+            if theseStandings is not None:
+                theseStandings.printStandings()
+            sys.stdout.flush()
+            time.sleep(args.watch)
+
+            try:
+                thisGameDay = gameDay(args.dayoffset)
+            except (Exception, URIException) as e:
+                # Keep showing the last good scoreboard until the next poll
+                sys.stderr.write("mlbscores: poll failed: %s\n" % e)
+                continue
+            if theseStandings is not None:
+                # Standings follow from the results just fetched, no extra request
+                theseStandings.applyGameDay(thisGameDay)
+    except KeyboardInterrupt:
+        sys.stdout.write("\n")
+
+
+def watchEvents(args, explicitTeams):
+    feed = gameEventFeed(explicitTeams)
+    interval = args.watch or 30
+    try:
+        while True:
+            try:
+                feed.poll(gameDay(args.dayoffset, verbose=False))
+            except (Exception, URIException) as e:
+                sys.stderr.write("mlbscores: poll failed: %s\n" % e)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
+
 def main(argv):
     global bestteams
 
-    args = configureArgParser().parse_args()
+    argparser = configureArgParser()
+    args = argparser.parse_args()
+    if args.leaders is not None and args.leaders < 1:
+        argparser.error("--leaders N must be at least 1")
+    if args.fetchstats:
+        atexit.register(fetchCoordinator.printStats)
 
     explicitTeams = getExplicitTeams(args.teams)
 
-    if args.standings:
+    if args.backfill:
+        storePath = args.store or "mlbscores-%d.db" % args.season
+        thisBackfill = seasonBackfill(args.season, storePath, args.workers, args.rate)
+        thisBackfill.run()
+
+    elif args.leaders is not None:
+        thisGameDay = gameDay(args.dayoffset)
+        if thisGameDay.getNumberOfGames() > 0:
+            theseLeaders = dailyLeaders(thisGameDay, args.leaders, args.workers)
+            theseLeaders.loadLeaders()
+            thisGameDay.printGameDayHeader()
+            theseLeaders.printLeaders()
+
+    elif args.events:
+        watchEvents(args, explicitTeams)
+
+    elif args.watch:
+        watchGameDay(args, explicitTeams)
+
+    elif args.standings:
         theseStandings = standings()
         theseStandings.printStandings()
 